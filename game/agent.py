@@ -1,6 +1,298 @@
-from game.gamestate import PaperRaceGameState, PaperRacePointType
+from game.gamestate import PaperRaceGameState, PaperRacePointType, Coord
 import random
 import collections
+import heapq
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    # numba is optional, without it the agents fall back to the pure
+    # python implementations
+    njit = None
+
+# integer codes for the point and effect types, so the jitted BFS can
+# switch on plain ints instead of enums and strings
+_STREET = PaperRacePointType.STREET.value
+_BLOCK = PaperRacePointType.BLOCK.value
+_EFFECT_NONE = 0
+_EFFECT_SAND = 1
+_EFFECT_MULTISPEED = 2
+_EFFECT_MAXSPEED = 3
+_EFFECT_BIGGERTARGETAREA = 4
+_EFFECT_CODES = {"SAND": _EFFECT_SAND,
+                 "MULTISPEED": _EFFECT_MULTISPEED,
+                 "MAXSPEED": _EFFECT_MAXSPEED,
+                 "BIGGERTARGETAREA": _EFFECT_BIGGERTARGETAREA}
+
+# op codes for apply_speed_effect, at most one effect sits on a cell
+_OP_NONE = 0
+_OP_MULT = 1
+_OP_MAXSPEED = 2
+
+# shared score tuples for destination area hits, so the hottest leaf of
+# the _score recursion doesn't allocate a fresh tuple on every call
+_DEST_SCORES = tuple((0, -d) for d in range(32))
+
+
+def _bfs_heuristic(type_grid, dest_mask, street_step, leave_cost,
+                   enter_penalty, neigh_offsets, neigh_indices, start_idx):
+    """Relaxing BFS over the grid arrays, used by PRAgent._build_h.
+
+    Works on flattened indices (x * height + y) with a preallocated ring
+    buffer queue instead of Coord keyed dicts and a deque. The step costs
+    come from the precomputed tables, so the inner loop is a single table
+    read per edge instead of a branch cascade.
+
+    Args:
+        type_grid (np.ndarray): uint8 array (width x height) with the
+           PaperRacePointType values of the grid
+        dest_mask (np.ndarray): bool array, True on the destination area
+        street_step (np.ndarray): float64 array, cost of a step from a
+           street point to the indexed point
+        leave_cost (np.ndarray): float64 array, cost of leaving the
+           indexed (non street) point
+        enter_penalty (np.ndarray): float64 array, extra cost for a step
+           from a non street point onto the indexed point
+        neigh_offsets (np.ndarray): int32 array of size width * height
+           + 1, CSR style offsets into neigh_indices
+        neigh_indices (np.ndarray): int32 array with the flattened
+           indices of the accessable neighbours of every point
+        start_idx (int): flattened index of the BFS start point
+
+    Returns:
+        (np.ndarray) float64 array (width x height) with the costs to
+        reach each point from the start. Unreached points are np.inf.
+    """
+    width, height = type_grid.shape
+    size = width * height
+    costs = np.full(size, np.inf, dtype=np.float64)
+    queue = np.empty(size, dtype=np.int32)
+    in_queue = np.zeros(size, dtype=np.bool_)
+
+    costs[start_idx] = 0.0
+    queue[0] = start_idx
+    in_queue[start_idx] = True
+    head = 0
+    tail = 1
+
+    while head != tail:
+        current = queue[head]
+        head = (head + 1) % size
+        in_queue[current] = False
+
+        cx = current // height
+        cy = current % height
+        cur_cost = costs[current]
+        cur_is_street = type_grid[cx, cy] == _STREET
+        cur_is_dest = dest_mask[cx, cy]
+        cur_leave = leave_cost[cx, cy]
+
+        # blocked points have empty adjacency lists, so no BLOCK filter
+        # is needed here
+        for k in range(neigh_offsets[current], neigh_offsets[current + 1]):
+            n = neigh_indices[k]
+            nx = n // height
+            ny = n % height
+
+            if cur_is_street:
+                new_cost = cur_cost + street_step[nx, ny]
+            elif cur_is_dest:
+                new_cost = cur_cost
+            else:
+                new_cost = cur_cost + cur_leave + enter_penalty[nx, ny]
+
+            if new_cost < costs[n]:
+                costs[n] = new_cost
+                if not in_queue[n]:
+                    queue[tail] = n
+                    tail = (tail + 1) % size
+                    in_queue[n] = True
+
+    return costs.reshape(width, height)
+
+
+def _dial_heuristic(type_grid, dest_mask, neigh_offsets, neigh_indices,
+                    start_idx):
+    """Jitted pendant to SimplePRAgent2._build_h.
+
+    Same relaxation loop as _bfs_heuristic, but with the subclass's
+    fixed cost model: leaving the destination area is free, a street to
+    street step costs 1 and every other step costs 1.5.
+
+    Args and return value match _bfs_heuristic (minus the cost tables).
+    """
+    width, height = type_grid.shape
+    size = width * height
+    costs = np.full(size, np.inf, dtype=np.float64)
+    queue = np.empty(size, dtype=np.int32)
+    in_queue = np.zeros(size, dtype=np.bool_)
+
+    costs[start_idx] = 0.0
+    queue[0] = start_idx
+    in_queue[start_idx] = True
+    head = 0
+    tail = 1
+
+    while head != tail:
+        current = queue[head]
+        head = (head + 1) % size
+        in_queue[current] = False
+
+        cx = current // height
+        cy = current % height
+        cur_cost = costs[current]
+        cur_is_street = type_grid[cx, cy] == _STREET
+        cur_is_dest = dest_mask[cx, cy]
+
+        for k in range(neigh_offsets[current], neigh_offsets[current + 1]):
+            n = neigh_indices[k]
+            nx = n // height
+            ny = n % height
+
+            if cur_is_dest:
+                new_cost = 0.0
+            elif cur_is_street and type_grid[nx, ny] == _STREET:
+                new_cost = cur_cost + 1.0
+            else:
+                new_cost = cur_cost + 1.5
+
+            if new_cost < costs[n]:
+                costs[n] = new_cost
+                if not in_queue[n]:
+                    queue[tail] = n
+                    tail = (tail + 1) % size
+                    in_queue[n] = True
+
+    return costs.reshape(width, height)
+
+
+def _is_reachable(type_grid, x1, y1, x2, y2):
+    """Jitted pendant to PaperRaceGrid.is_reachable.
+
+    Walks the rasterized line between the two points exactly like
+    grid.line() does (np.rint rounds half to even just like round())
+    and checks every point against the type grid.
+    """
+    width, height = type_grid.shape
+    dist = max(abs(x2 - x1), abs(y2 - y1))
+    for i in range(dist + 1):
+        if i == dist:
+            px = x2
+            py = y2
+        else:
+            t = i / dist
+            px = int(np.rint(x1 + t * (x2 - x1)))
+            py = int(np.rint(y1 + t * (y2 - y1)))
+        if px < 0 or px >= width or py < 0 or py >= height \
+                or type_grid[px, py] == _BLOCK:
+            return False
+    return True
+
+
+def _score_recursive(px, py, ox, oy, depth, rx, ry, h, type_grid,
+                     dest_mask, path_mask, effect_op, effect_param,
+                     max_step_cost):
+    """Jitted pendant to SimplePRAgent2._score.
+
+    Positions are passed as plain int pairs ((px, py) current, (ox, oy)
+    previous, (rx, ry) the racer's position). The score is the same
+    (value, -depth) tuple the python implementation returns.
+    """
+    width, height = type_grid.shape
+
+    if dest_mask[px, py] and (px != rx or py != ry):
+        return (0.0, -depth)
+
+    if depth == 0:
+        return (h[px, py], -depth)
+
+    if path_mask[px, py]:
+        return (h[px, py] + 1.0, -depth)
+
+    # speed vector and speed effects (see PRAgent.apply_speed_effect)
+    sx = float(px - ox)
+    sy = float(py - oy)
+    op = effect_op[px, py]
+    if op == _OP_MULT:
+        mult = effect_param[px, py]
+        sx *= mult
+        sy *= mult
+    elif op == _OP_MAXSPEED:
+        limit = effect_param[px, py]
+        speed_abs = max(abs(sx), abs(sy))
+        if speed_abs > limit:
+            sx *= limit / speed_abs
+            sy *= limit / speed_abs
+    tx = px + int(np.rint(sx))
+    ty = py + int(np.rint(sy))
+
+    # accessable neighbours of the new target, sorted by h (stable, so
+    # ties keep the offset order like sorted() does)
+    nh_x = np.empty(8, dtype=np.int64)
+    nh_y = np.empty(8, dtype=np.int64)
+    nh_h = np.empty(8, dtype=np.float64)
+    count = 0
+    for k in range(8):
+        nx = tx + _NEIGH_DX[k]
+        ny = ty + _NEIGH_DY[k]
+        if nx < 0 or nx >= width or ny < 0 or ny >= height \
+                or type_grid[nx, ny] == _BLOCK:
+            continue
+        nhv = h[nx, ny]
+        j = count
+        while j > 0 and nh_h[j - 1] > nhv:
+            nh_x[j] = nh_x[j - 1]
+            nh_y[j] = nh_y[j - 1]
+            nh_h[j] = nh_h[j - 1]
+            j -= 1
+        nh_x[j] = nx
+        nh_y[j] = ny
+        nh_h[j] = nhv
+        count += 1
+
+    if count == 0:
+        return (h[px, py], -depth)
+
+    best_val = np.inf
+    best_depth = -depth
+    slack = (depth - 1) * max_step_cost
+
+    # same three picks as SimplePRAgent2.neighbours: best, middle, worst
+    for pick in (0, count // 2, count - 1):
+        nx = nh_x[pick]
+        ny = nh_y[pick]
+
+        if h[nx, ny] - slack >= best_val:
+            continue
+
+        if not _is_reachable(type_grid, px, py, nx, ny):
+            continue
+
+        val, vdepth = _score_recursive(
+            nx, ny, px, py, depth - 1, rx, ry, h, type_grid, dest_mask,
+            path_mask, effect_op, effect_param, max_step_cost)
+        if val < best_val or (val == best_val and vdepth < best_depth):
+            best_val = val
+            best_depth = vdepth
+            if best_val == 0.0:
+                break
+
+    return (best_val, best_depth)
+
+
+# nogil lets a GUI thread keep running while an agent thinks and makes
+# the kernels usable from a thread pool if anyone wants to race agents
+# in parallel
+if njit is not None:
+    _bfs_heuristic = njit(cache=True, nogil=True)(_bfs_heuristic)
+    _dial_heuristic = njit(cache=True, nogil=True)(_dial_heuristic)
+    _is_reachable = njit(cache=True, nogil=True)(_is_reachable)
+    _score_recursive = njit(cache=True, nogil=True)(_score_recursive)
+
+_NEIGH_DX = np.array([0, 0, 1, -1, 1, -1, -1, 1], dtype=np.int64)
+_NEIGH_DY = np.array([1, -1, 0, 0, -1, -1, 1, 1], dtype=np.int64)
 
 class PRAgent:
     """Base class for a PaperRace agent
@@ -9,19 +301,156 @@ class PRAgent:
         gamestate (PapaerRaceGameState): the main gamestate object
         racer_id (int): the id of the racer that should be controled by the
            agent
-        h (dict[Coord, int]): heuristic for the rough distance between key
-           and the destination area in the grid
+        h (np.ndarray): heuristic for the rough distance to the destination
+           area, a float64 array of shape (grid.width, grid.height). Since
+           Coord is a tuple, h[pos] works just like the dict it replaces.
+           Unreachable points hold np.inf.
     """
+    # no __dict__ per instance, the attribute set is fixed anyway
+    __slots__ = ("gamestate", "racer_id", "racer", "h", "max_h",
+                 "_type_grid", "_effect_grid", "_dest_mask",
+                 "_street_step", "_leave_cost", "_enter_penalty",
+                 "_neigh_offsets", "_neigh_indices",
+                 "_effect_op", "_effect_param", "_destarea")
 
     def __init__(self, gamestate: PaperRaceGameState, racer_id: int):
         """Initialize the object"""
         self.gamestate = gamestate
         self.racer_id = racer_id
         self.racer = self.gamestate.racer[self.racer_id]
-        self.h = {}
-        self.max_h = float("inf")
-        self._build_h()
-        self.max_h = max(self.h.values())
+        self._type_grid, self._effect_grid, self._dest_mask \
+            = self._grid_arrays()
+        self._street_step, self._leave_cost, self._enter_penalty \
+            = self._cost_tables()
+        self._neigh_offsets, self._neigh_indices = self._build_adjacency()
+        self._effect_op, self._effect_param = self._effect_tables()
+        # the destination area never changes, keep the tuple for the
+        # start choice of _build_h instead of rebuilding it from the
+        # set on every call
+        self._destarea = tuple(self.gamestate.grid.destarea)
+        # h only depends on the static grid and the agent class, so
+        # agents on the same grid share one build; nobody writes to h
+        # after this point
+        grid = self.gamestate.grid
+        cached = grid._h_cache.get(type(self))
+        if cached is not None:
+            self.h, self.max_h = cached
+        else:
+            self.h = np.full((grid.width, grid.height),
+                             np.inf, dtype=np.float64)
+            self.max_h = float("inf")
+            self._build_h()
+            self.max_h = float(self.h[np.isfinite(self.h)].max())
+            grid._h_cache[type(self)] = (self.h, self.max_h)
+
+    def _grid_arrays(self):
+        """Convert the grid to NumPy arrays, used by the jitted functions.
+
+        Returns:
+            (tuple) uint8 array with the point types, uint8 array with the
+            _EFFECT_* codes and a bool mask of the destination area, all
+            of shape (grid.width, grid.height), indexed with (x, y).
+        """
+        grid = self.gamestate.grid
+        # the grid already keeps the point types as a dense uint8 array
+        type_grid = np.array(grid.grid, dtype=np.uint8)
+        effect_grid = np.zeros((grid.width, grid.height), dtype=np.uint8)
+        dest_mask = np.zeros((grid.width, grid.height), dtype=np.bool_)
+
+        for pos, effect in grid.effects.items():
+            effect_grid[pos] = _EFFECT_CODES.get(effect.type, _EFFECT_NONE)
+        for pos in grid.destarea:
+            dest_mask[pos] = True
+
+        return type_grid, effect_grid, dest_mask
+
+    def _cost_tables(self):
+        """Precompute the step cost tables used by _build_h.
+
+        The cost of an edge only depends on the static grid, so instead
+        of rebranching on point and effect types for every relaxed edge
+        the costs are tabled once per cell.
+
+        Returns:
+            (tuple) three float64 arrays of shape (width, height):
+            street_step (cost of a step from a street point to the
+            indexed point), leave_cost (cost of leaving the indexed non
+            street point) and enter_penalty (extra cost for a step from a
+            non street point onto the indexed point).
+        """
+        effect_grid = self._effect_grid
+        nasty = (effect_grid == _EFFECT_SAND) \
+            | (effect_grid == _EFFECT_MAXSPEED)
+
+        street_step = np.where(self._type_grid == _STREET, 5.0, 10.0)
+
+        leave_cost = np.full(effect_grid.shape, 5.0)
+        leave_cost[nasty] = 10.0
+        leave_cost[effect_grid == _EFFECT_BIGGERTARGETAREA] = 1.0
+
+        enter_penalty = np.where(nasty, 10.0, 0.0)
+
+        return street_step, leave_cost, enter_penalty
+
+    def _build_adjacency(self):
+        """Precompute the grid adjacency in CSR layout.
+
+        For the flattened point index i the flattened indices of its
+        accessable neighbours are neigh_indices[neigh_offsets[i]:
+        neigh_offsets[i + 1]]. Blocked points get empty lists. This
+        replaces the grid.neighbours() calls (which build a new list on
+        every call) in the jitted functions.
+
+        Returns:
+            (tuple) the int32 arrays neigh_offsets and neigh_indices
+        """
+        type_grid = self._type_grid
+        width, height = type_grid.shape
+        offsets = np.zeros(width * height + 1, dtype=np.int32)
+        indices = []
+
+        for x in range(width):
+            for y in range(height):
+                i = x * height + y
+                if type_grid[x, y] != _BLOCK:
+                    for dx, dy in ((0, 1), (0, -1), (1, 0), (-1, 0),
+                                   (1, -1), (-1, -1), (-1, 1), (1, 1)):
+                        nx = x + dx
+                        ny = y + dy
+                        if 0 <= nx < width and 0 <= ny < height \
+                                and type_grid[nx, ny] != _BLOCK:
+                            indices.append(nx * height + ny)
+                offsets[i + 1] = len(indices)
+
+        return offsets, np.array(indices, dtype=np.int32)
+
+    def _effect_tables(self):
+        """Precompute the speed effect parameters per cell.
+
+        apply_speed_effect() sits in the scoring loops, where the dict
+        lookup, the string dispatch on the effect type and especially
+        the config.getint() parse on every call add up. The parameters
+        are static, so they are parsed once into two arrays here.
+
+        Returns:
+            (tuple) two arrays of shape (width, height): an uint8 op
+            code per cell (_OP_NONE, _OP_MULT for SAND/MULTISPEED or
+            _OP_MAXSPEED) and a float64 op parameter (the multiplier
+            respectively the speed limit).
+        """
+        grid = self.gamestate.grid
+        effect_op = np.zeros((grid.width, grid.height), dtype=np.uint8)
+        effect_param = np.zeros((grid.width, grid.height))
+
+        for pos, effect in grid.effects.items():
+            if effect.type == "SAND" or effect.type == "MULTISPEED":
+                effect_op[pos] = _OP_MULT
+                effect_param[pos] = effect.config.getint("multiplier", 0)
+            elif effect.type == "MAXSPEED":
+                effect_op[pos] = _OP_MAXSPEED
+                effect_param[pos] = effect.config.getint("maxspeed", 0)
+
+        return effect_op, effect_param
 
     def _build_h(self, ):
         """Build the h dictionary.
@@ -36,50 +465,63 @@ class PRAgent:
         In this specific heuristic streets are way cheaper than than sand,
         what might not be useful for agents that simulate some future steps.
         """
-        start = random.choice(tuple(self.gamestate.grid.destarea))
-        queue = collections.deque()
-        queue.append(start)
-        self.h[start] = 0
-        visited = set()
+        if njit is not None:
+            # run the BFS jitted over the grid arrays
+            start = random.choice(self._destarea)
+            height = self.gamestate.grid.height
+            costs = _bfs_heuristic(self._type_grid, self._dest_mask,
+                                   self._street_step, self._leave_cost,
+                                   self._enter_penalty,
+                                   self._neigh_offsets, self._neigh_indices,
+                                   start[0] * height + start[1])
+            np.minimum(self.h, costs, out=self.h)
+            return
+
+        # hoist the attribute chains out of the loop, dict probes on them
+        # dominate the BFS otherwise
+        grid = self.gamestate.grid
+        destarea = grid.destarea
+        neighbours = grid.neighbours
+        h = self.h
+        street_step = self._street_step
+        leave_cost = self._leave_cost
+        enter_penalty = self._enter_penalty
+        STREET = PaperRacePointType.STREET
+        BLOCK = PaperRacePointType.BLOCK
+
+        # proper Dijkstra: the edge weights are not uniform, so a FIFO
+        # queue expands points with non final costs and has to re-relax
+        # them over and over; a heap expands each point once (stale
+        # entries are skipped)
+        start = random.choice(self._destarea)
+        h[start] = 0
+        pq = [(0.0, start)]
+
+        while pq:
+            cur_h, current = heapq.heappop(pq)
+            if cur_h > h[current]:
+                continue
 
-        while queue:
-            current = queue.popleft()
-            visited.add(current)
+            # everything that only depends on the current point is
+            # computed once per expansion, not once per edge
+            cur_is_street = grid[current] == STREET
+            cur_is_dest = current in destarea
+            cur_leave = cur_h + leave_cost[current]
 
-            nh = self.gamestate.grid.neighbours(current)
+            nh = neighbours(current)
             for n in nh:
-                if self.gamestate.grid[n] == PaperRacePointType.BLOCK:
+                if grid[n] == BLOCK:
                     continue
                 else:
-                    if self.gamestate.grid[current] == PaperRacePointType.STREET:
-                        if self.gamestate.grid[n] == PaperRacePointType.STREET:
-                            costs = self.h[current] + 5
-                        else:
-                            costs = self.h[current] + 10
-                    elif current in self.gamestate.grid.destarea:
-                        costs = self.h[current]
+                    if cur_is_street:
+                        costs = cur_h + street_step[n]
+                    elif cur_is_dest:
+                        costs = cur_h
                     else:
-                        if current in self.gamestate.grid.effects:
-                            effect = self.gamestate.grid.effects[current]
-                            costs = self.h[current] + 5
-                            if effect.type == "SAND":
-                                costs = self.h[current] + 10
-                            elif effect.type == "MULTISPEED":
-                                pass
-                            elif effect.type == "MAXSPEED":
-                                costs = self.h[current] + 10
-                            elif effect.type == "BIGGERTARGETAREA":
-                                costs = self.h[current] + 1
-                        else:
-                            costs = self.h[current] + 5
-                        if n in self.gamestate.grid.effects:
-                            effect = self.gamestate.grid.effects[n]
-                            if effect.type == "SAND" or effect.type == "MAXSPEED":
-                                costs += 10
-                                pass
-                    if n not in self.h or self.h[n] > costs:
-                        self.h[n] = costs
-                        queue.append(n)
+                        costs = cur_leave + enter_penalty[n]
+                    if h[n] > costs:
+                        h[n] = costs
+                        heapq.heappush(pq, (costs, n))
 
     def apply_speed_effect(self, pos, speed):
         """Apply an effect associated with the given position.
@@ -95,14 +537,15 @@ class PRAgent:
             (Coord) Return the changed speed. If no effect associated return
             the unchanged speed.
         """
-        if pos in self.gamestate.grid.effects:
-            effect = self.gamestate.grid.effects[pos]
-            if effect.type == "SAND" or effect.type == "MULTISPEED":
-                speed = effect.config.getint("multiplier", 0) * speed
-            elif effect.type == "MAXSPEED":
-                max_speed = effect.config.getint("maxspeed", 0)
-                if abs(speed) > max_speed:
-                    speed = (max_speed / abs(speed)) * speed
+        # the float() casts keep the multiplications on Coord.__rmul__,
+        # a NumPy scalar would broadcast the tuple to an array instead
+        op = self._effect_op[pos]
+        if op == _OP_MULT:
+            speed = float(self._effect_param[pos]) * speed
+        elif op == _OP_MAXSPEED:
+            max_speed = float(self._effect_param[pos])
+            if abs(speed) > max_speed:
+                speed = (max_speed / abs(speed)) * speed
         return round(speed)
 
     def next_position(self):
@@ -152,7 +595,14 @@ class SimplePRAgent2(PRAgent):
     distance to the destination area indipendendly from the type of the
     field) and different search depths.
     """
-    
+    __slots__ = ("search_depth", "_path_set", "_nh_cache",
+                 "_score_memo", "_prune_slack")
+
+    # estimate for how much the heuristic value can improve with one
+    # simulated step (the biggest edge weight used in _build_h), used to
+    # prune hopeless subtrees in _score
+    _MAX_STEP_COST = 1.5
+
     def __init__(self, gamestate, racer_id, search_depth=5):
         """Initialize agent
 
@@ -160,11 +610,33 @@ class SimplePRAgent2(PRAgent):
             look at PRAgent.init()
             search_depth (int): number of steps to simulate
         """
+        # PRAgent.__init__ already calls self._build_h(), which resolves
+        # to the override below, so no second build is needed here
         super().__init__(gamestate, racer_id)
-        self._build_h()
         self.search_depth = search_depth
+        self._path_set = set(map(tuple, self.racer.path.tolist()))
+        # lazily filled by neighbours(), valid for the agent's lifetime
+        self._nh_cache = {}
+        # transposition table of _score, reset every turn
+        self._score_memo = {}
+        # the search depth is fixed per agent, so the depth dependent
+        # pruning slack of _score can be evaluated once per depth here
+        # instead of once per visited node
+        self._prune_slack = tuple((d - 1) * self._MAX_STEP_COST
+                                  for d in range(search_depth + 2))
 
     def next_position(self):
+        # snapshot of the path for O(1) membership tests in _score; the
+        # path and the other racers changed since the last turn, so the
+        # memoized scores are stale as well
+        path = self.racer.path
+        self._path_set = set(map(tuple, path.tolist()))
+        self._score_memo = {}
+        if njit is not None:
+            # the jitted kernel reads the path as a mask
+            path_mask = np.zeros(self._type_grid.shape, dtype=np.bool_)
+            path_mask[path[:, 0], path[:, 1]] = True
+
         # return crash position if there is no choice
         if not self.racer.possible_next_positions:
             print("Agent goes to crash position")
@@ -173,13 +645,15 @@ class SimplePRAgent2(PRAgent):
         # current position of the agent's racer
         pos = self.racer.position
 
-        best_position = min(self.racer.possible_next_positions, key=lambda p: self.h[p])
+        cands = np.array(self.racer.possible_next_positions)
+        best_position = self.racer.possible_next_positions[
+            int(np.argmin(self.h[cands[:, 0], cands[:, 1]]))]
         #best_score = (float("inf"), 0)
         best_score = (self.h[best_position], 0)
 
         # choose the most promising position
         for new_pos in self.racer.possible_next_positions:
-            if new_pos in self.gamestate.grid.destarea \
+            if self._dest_mask[new_pos] \
                     and not self.gamestate.racer_on_position(new_pos):
                 return new_pos
 
@@ -193,7 +667,15 @@ class SimplePRAgent2(PRAgent):
                 new_pos = line[1]
                 old_pos = line[1]
 
-            score = self._score(new_pos, old_pos, self.search_depth)
+            if njit is not None:
+                score = _score_recursive(
+                    new_pos[0], new_pos[1], old_pos[0], old_pos[1],
+                    self.search_depth, pos[0], pos[1], self.h,
+                    self._type_grid, self._dest_mask, path_mask,
+                    self._effect_op, self._effect_param,
+                    self._MAX_STEP_COST)
+            else:
+                score = self._score(new_pos, old_pos, self.search_depth)
             #new_pos2 = pos + 2 * speed
             #if self.gamestate.grid.is_reachable(pos, new_pos2) and self.h[new_pos2] < self.h[new_pos]:
             #    score *= self.h[new_pos2]/self.max_h
@@ -204,42 +686,106 @@ class SimplePRAgent2(PRAgent):
         return best_position
 
     def neighbours(self, pos):
-        nh = sorted(self.gamestate.grid.neighbours(pos), key=lambda p: self.h[p])
-        if not nh:
-            return []
-        #return random.choices(self.gamestate.grid.neighbours(pos), k=2)
-        return [nh[0], nh[len(nh)//2], nh[-1]]
+        # called for every node of the _score recursion; h never changes
+        # after _build_h, so the sorted picks are cached for good
+        cached = self._nh_cache.get(pos)
+        if cached is not None:
+            return cached
+        nh = sorted(self.gamestate.grid.neighbours(pos), key=self.h.__getitem__)
+        #picks = random.choices(self.gamestate.grid.neighbours(pos), k=2)
+        picks = [nh[0], nh[len(nh)//2], nh[-1]] if nh else []
+        self._nh_cache[pos] = picks
+        return picks
 
     def _score(self, pos, old_pos, depth=6):
-        if pos in self.gamestate.grid.destarea and pos != self.racer.position:
-            return (0, -depth)
-
-        if depth == 0:
-            return (self.h[pos], -depth)
-
-        if pos in self.racer.path:
-            return (self.h[pos]+1, -depth)
-
-        speed = pos - old_pos
-        speed = self.apply_speed_effect(pos, speed)
-
-        new_target = pos + speed
-
-        #nh = self.gamestate.grid.neighbours(new_target)
-        nh = self.neighbours(new_target)
-        if not nh:
-            return (self.h[pos], -depth)
-
-        #best_score = (self.h[pos], -depth)
-        best_score = (float("inf"), -depth)
-
-        for n in nh:
-            if not self.gamestate.grid.is_reachable(pos, n):
-                continue
-
-            best_score = min(self._score(n, pos, depth-1), best_score)
-
-        return best_score
+        # depth first search over an explicit stack instead of python
+        # recursion, so the hot path pays no call frame per node; every
+        # frame holds the node, its candidate picks and the best child
+        # found so far
+        h = self.h
+        dest_mask = self._dest_mask
+        path_set = self._path_set
+        racer_pos = self.racer.position
+        neighbours = self.neighbours
+        apply_speed_effect = self.apply_speed_effect
+        is_reachable = self.gamestate.grid.is_reachable
+        prune_slack = self._prune_slack
+        memo = self._score_memo
+        inf = float("inf")
+
+        stack = []
+        node = (pos, old_pos, depth)
+        result = None
+
+        while True:
+            if node is not None:
+                npos, nold, ndepth = node
+                # leaf checks, same order as the old recursive version
+                if dest_mask[npos] and npos != racer_pos:
+                    result = (_DEST_SCORES[ndepth]
+                              if ndepth < 32 else (0, -ndepth))
+                elif ndepth == 0:
+                    result = (h[npos], -ndepth)
+                elif npos in path_set:
+                    result = (h[npos] + 1, -ndepth)
+                else:
+                    # the same state is reached through many different
+                    # branches of the search tree, so the finished
+                    # frames below feed this transposition table
+                    cached = memo.get(node)
+                    if cached is not None:
+                        result = cached
+                    else:
+                        speed = apply_speed_effect(npos, npos - nold)
+                        nh = neighbours(npos + speed)
+                        if not nh:
+                            result = (h[npos], -ndepth)
+                        else:
+                            stack.append([node, nh, 0, inf, -ndepth])
+                            node = None
+                            continue
+                node = None
+
+            if not stack:
+                return result
+
+            frame = stack[-1]
+
+            # merge a finished child into the top frame
+            if result is not None:
+                if result < (frame[3], frame[4]):
+                    frame[3], frame[4] = result
+                    if frame[3] == 0:
+                        # a destination area hit can't be beaten
+                        frame[2] = len(frame[1])
+                result = None
+
+            # descend into the frame's next candidate; neighbours()
+            # returns them sorted by h, so the most promising subtree is
+            # searched first and the cutoff below hits as early as
+            # possible
+            fpos = frame[0][0]
+            fdepth = frame[0][2]
+            nh = frame[1]
+            idx = frame[2]
+            best_val = frame[3]
+            slack = prune_slack[fdepth]
+            while idx < len(nh):
+                n = nh[idx]
+                idx += 1
+                # h can drop by at most _MAX_STEP_COST per simulated
+                # step, so this subtree can't beat the best score so far
+                if h[n] - slack >= best_val:
+                    continue
+                if not is_reachable(fpos, n):
+                    continue
+                node = (n, fpos, fdepth - 1)
+                break
+            frame[2] = idx
+            if node is None:
+                stack.pop()
+                result = (frame[3], frame[4])
+                memo[frame[0]] = result
 
     def _build_h(self, ):
         """Build the h dictionary.
@@ -249,34 +795,69 @@ class SimplePRAgent2(PRAgent):
         as key) to the destination area. As better this heuristic is, as
         better every search algorithm will work.
         """
-        start = random.choice(tuple(self.gamestate.grid.destarea))
-        queue = collections.deque()
-        queue.append(start)
-        self.h[start] = 0
-        visited = set()
+        if njit is not None:
+            # same pattern as PRAgent._build_h, with the cost model of
+            # this agent baked into the kernel
+            start = random.choice(self._destarea)
+            height = self.gamestate.grid.height
+            costs = _dial_heuristic(self._type_grid, self._dest_mask,
+                                    self._neigh_offsets,
+                                    self._neigh_indices,
+                                    start[0] * height + start[1])
+            np.minimum(self.h, costs, out=self.h)
+            return
+
+        # same local binding trick as in PRAgent._build_h
+        grid = self.gamestate.grid
+        destarea = grid.destarea
+        neighbours = grid.neighbours
+        h = self.h
+        STREET = PaperRacePointType.STREET
+        BLOCK = PaperRacePointType.BLOCK
+
+        # Dial's bucket queue: the edge weights are 0, 1 and 1.5, scaled
+        # by two they are the small integers 0, 2 and 3, so four cyclic
+        # buckets cover every cost that can be in flight at a time and
+        # each point is expanded with its final cost instead of being
+        # re-relaxed like with the FIFO queue
+        nb_buckets = 4
+        buckets = [collections.deque() for _ in range(nb_buckets)]
+
+        start = random.choice(self._destarea)
+        h[start] = 0
+        buckets[0].append((0.0, start))
+        remaining = 1
+        level = 0
+
+        while remaining:
+            bucket = buckets[level % nb_buckets]
+            level += 1
+            while bucket:
+                cur_h, current = bucket.popleft()
+                remaining -= 1
+                if cur_h > h[current]:
+                    # a cheaper path was found after this entry was
+                    # queued
+                    continue
 
-        while queue:
-            current = queue.popleft()
-            visited.add(current)
+                cur_is_street = grid[current] == STREET
+                cur_is_dest = current in destarea
 
-            nh = self.gamestate.grid.neighbours(current)
-            for n in nh:
-                if self.gamestate.grid[n] == PaperRacePointType.BLOCK:
-                    continue
-                else:
-                    if current in self.gamestate.grid.destarea:
+                for n in neighbours(current):
+                    if grid[n] == BLOCK:
+                        continue
+                    if cur_is_dest:
                         costs = 0
-                    elif self.gamestate.grid[current] == PaperRacePointType.STREET:
-                        if self.gamestate.grid[n] == PaperRacePointType.STREET:
-                            costs = self.h[current] + 1
-                        else:
-                            costs = self.h[current] + 1.5
+                    elif cur_is_street and grid[n] == STREET:
+                        costs = cur_h + 1
                     else:
-                        costs = self.h[current] + 1.5
+                        costs = cur_h + 1.5
 
-                    if n not in self.h or self.h[n] > costs:
-                        self.h[n] = costs
-                        queue.append(n)
+                    if h[n] > costs:
+                        h[n] = costs
+                        buckets[int(costs * 2) % nb_buckets].append(
+                            (costs, n))
+                        remaining += 1
 
 
 class SimplePRAgent(PRAgent):
@@ -289,6 +870,8 @@ class SimplePRAgent(PRAgent):
 
     Works suprisingly good, but it's also not a winner type of agent.
     """
+    __slots__ = ()
+
     def __init__(self, gamestate, racer_id):
         super().__init__(gamestate, racer_id)
 
@@ -302,35 +885,58 @@ class SimplePRAgent(PRAgent):
         best_score = float("inf")
         best_position = None
 
-        # choose the most promising position
-        for new_pos in self.racer.possible_next_positions:
-            if new_pos in self.gamestate.grid.destarea \
-                    and not self.gamestate.racer_on_position(new_pos):
-                return new_pos
+        # batch the per candidate lookups: base scores and destination
+        # membership for all candidates come from two fancy indexing
+        # gathers instead of one dict probe per candidate
+        candidates = self.racer.possible_next_positions
+        cands = np.array(candidates)
+        base_scores = self.h[cands[:, 0], cands[:, 1]] / self.max_h
+        dest_hits = self._dest_mask[cands[:, 0], cands[:, 1]]
+        cand_ops = self._effect_op[cands[:, 0], cands[:, 1]]
+
+        # hoist the attribute chains out of the candidate loop, like in
+        # the _build_h and _score hot paths
+        racer_on_position = self.gamestate.racer_on_position
+        is_reachable = self.gamestate.grid.is_reachable
+        apply_speed_effect = self.apply_speed_effect
+        forward_factor = self._forward_factor
+        dest_mask = self._dest_mask
+        h = self.h
+        max_h = self.max_h
+
+        for i in np.nonzero(dest_hits)[0]:
+            if not racer_on_position(candidates[i]):
+                return candidates[i]
 
-            if self.gamestate.racer_on_position(new_pos):
-                score = (self.h[new_pos])/(self.max_h)
-                speed = new_pos - pos
+        # choose the most promising position
+        for new_pos, base_score, op in zip(candidates, base_scores, cand_ops):
+            score = float(base_score)
+            speed = new_pos - pos
+            if racer_on_position(new_pos):
                 if abs(speed) > 0:
                     speed = round((1/abs(speed)) * speed)
-            else:
-                score = self.h[new_pos]/self.max_h
-
-                speed = new_pos - pos
-                speed = self.apply_speed_effect(new_pos, speed)
+            elif op != _OP_NONE:
+                speed = apply_speed_effect(new_pos, speed)
             new_pos1 = new_pos
             new_pos2 = pos + speed
-            for i in range(1, abs(speed)):
-                if self.gamestate.grid.is_reachable(new_pos1, new_pos2):
-                    #if self.h[new_pos2] < self.h[new_pos1]:
-                        score *= self.h[new_pos2]/self.max_h
-                else:
-                    break
-                if new_pos2 in self.gamestate.grid.destarea:
-                    return new_pos
-                new_pos1 = new_pos2
-                speed = self.apply_speed_effect(new_pos1, speed)
-                new_pos2 = new_pos1 + speed
+            factor = forward_factor(new_pos, new_pos2, speed)
+            if factor is not None:
+                score *= factor
+            else:
+                # something on the trajectory changes the speed, leads to
+                # the destination area or blocks the way, so simulate
+                # step by step
+                for i in range(1, abs(speed)):
+                    if is_reachable(new_pos1, new_pos2):
+                        #if h[new_pos2] < h[new_pos1]:
+                            score *= h[new_pos2]/max_h
+                    else:
+                        break
+                    if dest_mask[new_pos2]:
+                        return new_pos
+                    new_pos1 = new_pos2
+                    speed = apply_speed_effect(new_pos1, speed)
+                    new_pos2 = new_pos1 + speed
 
             #new_pos2 = pos + 2 * speed
             #if self.gamestate.grid.is_reachable(pos, new_pos2) and self.h[new_pos2] < self.h[new_pos]:
@@ -341,13 +947,57 @@ class SimplePRAgent(PRAgent):
                 best_position = new_pos
         return best_position
 
-    def apply_speed_effect(self, pos, speed):
-        if pos in self.gamestate.grid.effects:
-            effect = self.gamestate.grid.effects[pos]
-            if effect.type == "SAND" or effect.type == "MULTISPEED":
-                speed = effect.config.getint("multiplier", 0) * speed
-            elif effect.type == "MAXSPEED":
-                max_speed = effect.config.getint("maxspeed", 0)
-                if abs(speed) > max_speed:
-                    speed = (max_speed / abs(speed)) * speed
-        return round(speed)
+    def _forward_factor(self, start, first_target, speed):
+        """Vectorized fast path for the forward simulation.
+
+        As long as no point on the simulated trajectory carries a speed
+        effect or lies in the destination area, the speed stays constant
+        and the whole score factor can be computed with a few array
+        operations instead of the step by step loop.
+
+        Args:
+            start (Coord): position the simulation starts from
+            first_target (Coord): first simulated target (pos + speed)
+            speed (Coord): the (constant) speed vector
+
+        Returns:
+            (float) the factor to multiply the score with, or None if
+            the trajectory needs the step by step simulation.
+        """
+        steps = abs(speed) - 1
+        if steps <= 0:
+            return 1.0
+
+        width, height = self._type_grid.shape
+        targets = np.asarray(first_target) \
+            + np.arange(steps)[:, None] * np.asarray(speed)
+        if (targets < 0).any() or (targets[:, 0] >= width).any() \
+                or (targets[:, 1] >= height).any():
+            return None
+
+        tx = targets[:, 0]
+        ty = targets[:, 1]
+        # speed effects and destination hits need the scalar loop
+        if (self._effect_grid[tx, ty] != _EFFECT_NONE).any() \
+                or self._dest_mask[tx, ty].any():
+            return None
+
+        # the first segment runs from the chosen position to the first
+        # target and is not collinear with the rest of the trajectory
+        if not self.gamestate.grid.is_reachable(start, first_target):
+            return 1.0
+
+        # rasterize the remaining segments (all of length abs(speed))
+        # the same way grid.line() does and check them against the grid
+        if steps > 1:
+            dist = abs(speed)
+            ts = (np.arange(dist + 1) / dist)[None, :, None]
+            segs = targets[:-1]
+            points = np.rint(
+                segs[:, None, :] + ts * (targets[1:] - segs)[:, None, :]
+            ).astype(np.intp)
+            if (self._type_grid[points[..., 0], points[..., 1]]
+                    == _BLOCK).any():
+                return None
+
+        return float(np.prod(self.h[tx, ty] / self.max_h))
@@ -32,41 +32,56 @@ outside sthe track, minimal speed for some rounds in case of a crash, etc.
 """
 
 from PIL import Image
+import bisect
 import itertools
-from enum import Enum
+import operator
+from enum import IntEnum
 import configparser
 import random
 
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    # numba is optional, without it the grid falls back to the pure
+    # python implementations
+    njit = None
+
 
 class Coord(tuple):
     """Used for positions, vectors, etc. Basically tuples, with the
     possibility for basic calculation
+
+    The operators are spelled out for exactly two elements: building a
+    generator plus iterating it costs more than the actual arithmetic,
+    and everything in this game is two dimensional anyway.
     """
     def __add__(self, other):
-        return Coord(x + y for x, y in zip(self, other))
+        return Coord((self[0] + other[0], self[1] + other[1]))
 
     def __sub__(self, other):
-        return Coord(x - y for x, y in zip(self, other))
+        return Coord((self[0] - other[0], self[1] - other[1]))
 
     def __rmul__(self, other):
         """Elementwise mulitplication with a scalar"""
-        return Coord(other * x for x in self)
+        return Coord((other * self[0], other * self[1]))
 
     __lmul__ = __rmul__
 
     def __truediv__(self, other):
         """Elementwise division with a scalar. other must not be 0"""
-        return Coord(x/other for x in self)
+        return Coord((self[0] / other, self[1] / other))
 
     def __round__(self):
-        return Coord(map(round, self))
+        return Coord((round(self[0]), round(self[1])))
 
     def __abs__(self):
         """Absolute value, according to manhatten distance"""
-        return max(map(abs, self))
+        return max(abs(self[0]), abs(self[1]))
 
     def scalar_multiplication(self, other):
-        return sum([x * y for x, y in zip(self, other)])
+        return self[0] * other[0] + self[1] * other[1]
 
     @property
     def x(self):
@@ -77,13 +92,60 @@ class Coord(tuple):
         return self[1]
 
 
-class PaperRacePointType(Enum):
-    """Different types of points on the grid"""
+class PaperRacePointType(IntEnum):
+    """Different types of points on the grid.
+
+    An IntEnum, so the members compare equal to the raw codes stored in
+    the grid array.
+    """
     STREET = 1
     BLOCK = 2
     EFFECT = 4
 
 
+# offsets of the eight neighbour points, the order is part of the game
+# behaviour (ties in the agents' sorted picks resolve along it)
+_NEIGH_OFFSETS = ((0, 1), (0, -1), (1, 0), (-1, 0),
+                  (1, -1), (-1, -1), (-1, 1), (1, 1))
+
+# raw point type codes (see PaperRacePointType) for the jitted kernel
+# and the hot path comparisons, where a plain int compare beats the
+# enum dispatch
+_STREET_CODE = 1
+_BLOCK_CODE = 2
+_EFFECT_CODE = 4
+
+# sort key for effect lists, built once instead of a lambda per insert
+_EFFECT_PRIORITY = operator.attrgetter("priority")
+
+
+def _line_reachable(grid, x1, y1, x2, y2):
+    """Fused line() plus accessability walk, used by is_reachable.
+
+    Rasterizes exactly like PaperRaceGrid.line (np.rint rounds half to
+    even just like round()) and bails out at the first point off the
+    grid or on a block.
+    """
+    width, height = grid.shape
+    dist = max(abs(x2 - x1), abs(y2 - y1))
+    for i in range(dist + 1):
+        if i == dist:
+            px = x2
+            py = y2
+        else:
+            t = i / dist
+            px = int(np.rint(x1 + t * (x2 - x1)))
+            py = int(np.rint(y1 + t * (y2 - y1)))
+        if px < 0 or px >= width or py < 0 or py >= height \
+                or grid[px, py] == _BLOCK_CODE:
+            return False
+    return True
+
+
+if njit is not None:
+    _line_reachable = njit(cache=True, nogil=True)(_line_reachable)
+
+
 class PaperRaceGrid:
     """Represent the paper, on which the game is played"""
 
@@ -99,7 +161,6 @@ class PaperRaceGrid:
         self.config = config
         # init empty grid, just to initialize class properties
         self.init_grid(0, 0)
-        self.effects = {}
 
     def init_grid(self, w, h):
         """Initialize grid.
@@ -115,16 +176,25 @@ class PaperRaceGrid:
         """
         self.width = w
         self.height = h
-        # init grid with zeros
-        self.grid = dict({
-                (x, y): 0
-                for x, y
-                in itertools.product(
-                    range(self.width), range(self.height)
-                )
-            })
+        # dense point type array instead of a dict keyed by (x, y);
+        # Coords are tuples, so grid[pos] indexing stays the same
+        self.grid = np.zeros((w, h), dtype=np.uint8)
         self.startarea = set()
         self.destarea = set()
+        self.effects = {}
+        # the grid is static once loaded, so neighbour lists and
+        # reachability answers can be memoized until the next load
+        self._neigh_cache = {}
+        self._reach_cache = {}
+        self._candidate_cache = {}
+        # per-agent-class heuristic arrays, shared by PRAgent.__init__
+        self._h_cache = {}
+        # precomputed "not a BLOCK" mask, rebuilt by load_from_bitmap
+        self._accessible = self.grid != _BLOCK_CODE
+        # coordinates of the street/effect cells for the GUI marker
+        # layers, filled by load_from_bitmap
+        self.street_coords = np.empty((0, 2), dtype=np.int32)
+        self.effect_coords = np.empty((0, 2), dtype=np.int32)
 
     def __getitem__(self, position):
         """Get the type of the point at given position.
@@ -135,17 +205,21 @@ class PaperRaceGrid:
             position (Coord): position
 
         Returns:
-            (PaperRacerPointType) STREET, EFFECT or BLOCK
+            (int) one of the PaperRacePointType codes, or None if the
+            position is off the grid (like dict.get did)
         """
-        return self.grid.get(position)
+        x, y = position
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.grid[x, y]
+        return None
 
     def items(self):
-        """Shortcut to self.grid.items()"""
-        return self.grid.items()
+        """Iterate ((x, y), point type code) like the old dict did"""
+        return np.ndenumerate(self.grid)
 
     def values(self):
-        """Shortcut to self.grid.values()"""
-        return self.grid.values()
+        """Iterate the point type codes like the old dict did"""
+        return self.grid.flat
 
     def in_range(self, position):
         """Check if position is on the grid.
@@ -156,7 +230,8 @@ class PaperRaceGrid:
         Returns:
             (bool)
         """
-        return position in self.grid
+        x, y = position
+        return 0 <= x < self.width and 0 <= y < self.height
 
     def is_accessable(self, position):
         """Check if a position in the grid is accessable.
@@ -169,8 +244,9 @@ class PaperRaceGrid:
         Returns:
             (bool)
         """
-        return self.in_range(position) \
-            and self.grid[position] != PaperRacePointType.BLOCK
+        x, y = position
+        return bool(0 <= x < self.width and 0 <= y < self.height
+                    and self._accessible[x, y])
 
     def is_reachable(self, start, dest):
         """Check if a position on the grid is reachable from another position.
@@ -185,11 +261,72 @@ class PaperRaceGrid:
             into a PaperRacerPointType.BLOCK field (which would cause a
             PRCrashEffect). False otherwise
         """
-        line = self.line(start, dest)
-        for p in line:
-            if not self.is_accessable(p):
-                return False
-        return True
+        key = (start[0], start[1], dest[0], dest[1])
+        cached = self._reach_cache.get(key)
+        if cached is not None:
+            return cached
+        if njit is not None:
+            # fused kernel, no intermediate line list
+            result = bool(_line_reachable(self.grid, start[0], start[1],
+                                          dest[0], dest[1]))
+        else:
+            # fused fallback: walk the same raster line() produces, but
+            # bail at the first blocked point without building the list
+            x1, y1 = start
+            dx = dest[0] - x1
+            dy = dest[1] - y1
+            distance = max(abs(dx), abs(dy))
+            accessable = self.is_accessable
+            result = True
+            for i in range(distance):
+                t = i / distance
+                if not accessable((round(x1 + t * dx), round(y1 + t * dy))):
+                    result = False
+                    break
+            else:
+                result = accessable(dest)
+        self._reach_cache[key] = result
+        return result
+
+    def reachable_from(self, position, speed):
+        """Return the candidate positions for a racer moving at speed.
+
+        The candidates (and the crash position, if there are none)
+        depend only on the static grid, so the answers are memoized
+        like the reachability ones.
+
+        Args:
+            position (Coord): position of the racer
+            speed (Coord): current speed of the racer
+
+        Returns:
+            (tuple) pair of a tuple with the candidate positions and
+            the crash position (None if there are candidates)
+        """
+        key = (position[0], position[1], speed[0], speed[1])
+        cached = self._candidate_cache.get(key)
+        if cached is not None:
+            return cached
+
+        target = position + speed
+        is_reachable = self.is_reachable
+        next_positions = [target] + self.neighbours(target)
+        candidates = tuple(p for p in next_positions
+                           if is_reachable(position, p))
+
+        # if there is no position reachable with current speed the
+        # crash position is the last accessable point towards target
+        crash_position = None
+        if not candidates:
+            for p in self.line(position, target):
+                if self.is_accessable(p):
+                    crash_position = p
+                else:
+                    break
+
+        result = (candidates, crash_position)
+        self._candidate_cache[key] = result
+        return result
 
     def load_from_bitmap(self, filename):
         """Load the grid from a bitmap file.
@@ -214,26 +351,53 @@ class PaperRaceGrid:
 
         self.init_grid(w//cell_size, h//cell_size)
 
-        for x, y in self.grid:
-            pixel = im_rgb.getpixel(((x+0.5)*cell_size, (y+0.5)*cell_size))
-            if pixel == self.config.blockcolor:
-                self.grid[x, y] = PaperRacePointType.BLOCK
-            elif pixel == self.config.streetcolor:
-                self.grid[x, y] = PaperRacePointType.STREET
-            elif pixel == self.config.startcolor:
-                self.startarea.add(Coord((x, y)))
-                self.grid[x, y] = PaperRacePointType.STREET
-            elif pixel == self.config.destcolor:
-                self.destarea.add(Coord((x, y)))
-                self.grid[x, y] = PaperRacePointType.STREET
-            else:
-                if pixel in self.config.effects:
-                    self.effects[x, y] = self.config.effects[pixel]
-                self.grid[x, y] = PaperRacePointType.EFFECT
+        # sample the cell centers in one numpy gather instead of one
+        # getpixel call per cell; centers is (width, height, 3) so the
+        # masks below line up with the grid array
+        arr = np.asarray(im_rgb)
+        xs = np.arange(self.width) * cell_size + cell_size // 2
+        ys = np.arange(self.height) * cell_size + cell_size // 2
+        centers = arr[np.ix_(ys, xs)].transpose(1, 0, 2)
+
+        block = (centers == self.config.blockcolor).all(-1)
+        street = (centers == self.config.streetcolor).all(-1)
+        start = (centers == self.config.startcolor).all(-1)
+        dest = (centers == self.config.destcolor).all(-1)
+
+        self.grid[street | start | dest] = PaperRacePointType.STREET
+        self.grid[block] = PaperRacePointType.BLOCK
+        other = ~(block | street | start | dest)
+        self.grid[other] = PaperRacePointType.EFFECT
+
+        self.startarea = {Coord((int(x), int(y)))
+                          for x, y in np.argwhere(start)}
+        self.destarea = {Coord((int(x), int(y)))
+                         for x, y in np.argwhere(dest)}
+
+        self._accessible = self.grid != _BLOCK_CODE
+
+        # gather the marker coordinates while the masks are at hand
+        self.street_coords = np.argwhere(street | start | dest) \
+            .astype(np.int32)
+        self.effect_coords = np.argwhere(other).astype(np.int32)
+
+        # only the leftover cells can carry an effect color; match them
+        # against the packed-int color keys in one go
+        effects_packed = self.config._effects_packed
+        if effects_packed:
+            packed = (centers[..., 0].astype(np.int32) << 16
+                      | centers[..., 1].astype(np.int32) << 8
+                      | centers[..., 2])
+            hits = other & np.isin(packed, list(effects_packed))
+            for x, y in np.argwhere(hits):
+                self.effects[int(x), int(y)] = \
+                    effects_packed[int(packed[x, y])]
 
     def dist(self, p1, p2):
         """Return the manhatten distance between two points."""
-        return max([abs(v1-v2) for v1, v2 in zip(p1, p2)])
+        a = abs(p1[0] - p2[0])
+        b = abs(p1[1] - p2[1])
+        return a if a > b else b
 
     def line(self, p1, p2):
         """Return all points on the line between two points.
@@ -247,13 +411,21 @@ class PaperRaceGrid:
             p1, last element is p2. If p1 == p2 the list has only one
             element.
         """
-        distance = self.dist(p1, p2)
+        # scalarized: the Coord subtract/multiply/add/round chain per
+        # step allocated four tuples each; the raster itself (round
+        # interpolation) must stay exactly as it is, the agents mirror
+        # it in their own kernels
+        x1, y1 = p1
+        x2, y2 = p2
+        dx = x2 - x1
+        dy = y2 - y1
+        distance = max(abs(dx), abs(dy))
         line = list()
+        append = line.append
         for i in range(distance):
-            p = p1 + (i/distance)*(p2-p1)
-
-            line.append(round(p))
-        line.append(p2)
+            t = i / distance
+            append(Coord((round(x1 + t * dx), round(y1 + t * dy))))
+        append(p2)
         return line
 
     def neighbours(self, p):
@@ -266,17 +438,27 @@ class PaperRaceGrid:
             (list) of all neighbours of p, that are accessable (accoring
             to PaperRaceGrid.is_accessable()).
         """
-        nh = [
-            p + d
-            for d
-            in [(0, 1), (0, -1), (1, 0), (-1, 0),
-                (1, -1), (-1, -1), (-1, 1), (1, 1)]
-        ]
-        nh = [p for p in nh if self.is_accessable(p)]
+        cached = self._neigh_cache.get(p)
+        if cached is not None:
+            return cached
+        # one pass with the bounds check inlined, instead of building a
+        # throwaway offset list and filtering through is_accessable
+        x, y = p
+        width = self.width
+        height = self.height
+        grid = self.grid
+        nh = []
+        for dx, dy in _NEIGH_OFFSETS:
+            nx = x + dx
+            ny = y + dy
+            if 0 <= nx < width and 0 <= ny < height \
+                    and grid[nx, ny] != _BLOCK_CODE:
+                nh.append(Coord((nx, ny)))
+        self._neigh_cache[p] = nh
         return nh
 
 
-class PREffectType(Enum):
+class PREffectType(IntEnum):
     """Specify diferent types of effects"""
     SpeedEffect = 1
     TargetAreaEffect = 2
@@ -353,9 +535,10 @@ class PRMaxSpeedEffect(PREffect):
     def apply(self):
         if not super().apply():
             return False
-        if abs(self.racer.speed) > self.max_speed:
-            self.racer.speed = round((
-                self.max_speed / abs(self.racer.speed)) * self.racer.speed)
+        speed = self.racer.speed
+        magnitude = abs(speed)
+        if magnitude > self.max_speed:
+            self.racer.speed = round((self.max_speed / magnitude) * speed)
         return True
 
 
@@ -377,8 +560,9 @@ class PRMultiSpeedEffect(PREffect):
     def apply(self):
         if not super().apply():
             return False
-        if abs(self.racer.speed) > 0:
-            self.racer.speed = round(self.multiplier * self.racer.speed)
+        speed = self.racer.speed
+        if abs(speed) > 0:
+            self.racer.speed = round(self.multiplier * speed)
         return True
 
 
@@ -440,10 +624,15 @@ class PRBiggerTargetAreaEffect(PREffect):
         if not super().apply():
             return False
         next_positions = set()
+        neighbours = self.racer.grid.neighbours
 
         for p in self.racer.possible_next_positions:
-            next_positions |= set(self.racer.grid.neighbours(p))
-        self.racer.possible_next_positions = list(next_positions)
+            # update() consumes the list directly instead of wrapping
+            # it in a throwaway set per position
+            next_positions.update(neighbours(p))
+        # _rebuild_candidates converts back to a list after the last
+        # stacked effect has run
+        self.racer.possible_next_positions = next_positions
 
 
 class PaperRacer:
@@ -458,21 +647,23 @@ class PaperRacer:
         speed (Coord): current speed of the racer (as vector). It can be
            affected by PRMAXSpeedEffect objects and PRMultipleSpeedEffect
            objects
-        path (list[Coord]): list of all points the racer has been. Last entries
-           are the lates
+        path (numpy.ndarray): (n, 2) int array of all points the racer has
+           been. Last entries are the lates
         possible_nect_positions (list[Coord]): list of the positions the player
            can choose his next move from. This list is affected by
            PRTargetAreaEffect objects.
-        effects (list[PREffect]): a list of effects currently affecting the
-           racer. If the duration of an effect is down to 0 it will be deleted
+        effects (dict[PREffectType, list[PREffect]]): the effects currently
+           affecting the racer, bucketed by effect type and sorted by
+           priority. If the duration of an effect is down to 0 it will be
+           deleted
         """
 
     def __init__(self, racer_id, grid, gamestate, position):
         """Initialize object
 
         Args:
-            racer_id (int): id of the racer. It's used to check if two objects
-               represent the same racer via the PRPaperRacer.__eq__() operator
+            racer_id (int): id of the racer. The gamestate owns exactly one
+               racer object per id, so identity comparison suffices
             grid (PaperRacerGrid): main grid, on which the game is played.
                used to check whats on the grid, which target points possible,
                etc
@@ -485,16 +676,36 @@ class PaperRacer:
         self.gamestate = gamestate
         self.position = Coord(position)
         self.speed = Coord((0, 0))
-        self.path = [self.position]
+        # the path is kept in a pre-allocated int array with a write
+        # cursor, so agents can analyze it without touching per-point
+        # Coord objects; see the path property
+        self._path = np.empty((64, 2), dtype=np.int32)
+        self._path_len = 0
+        self._push_path(self.position)
 
         self.possible_next_positions = list()
+        self._possible_set = set()
         self._calc_possible_next_positions()
         self.crash_position = None
 
-        self.effects = list()
+        # bucketed by type, so applying one type doesn't filter past
+        # the effects of the other
+        self.effects = {etype: [] for etype in PREffectType}
+
+    @property
+    def path(self):
+        """All points the racer has been, as an (n, 2) int array.
+
+        Last entries are the latest ones.
+        """
+        return self._path[:self._path_len]
 
-    def __eq__(self, other):
-        return self.id == other.id
+    def _push_path(self, position):
+        """Append a position to the path, growing the array if needed."""
+        if self._path_len == len(self._path):
+            self._path = np.resize(self._path, (self._path_len * 2, 2))
+        self._path[self._path_len] = position
+        self._path_len += 1
 
     def _calc_possible_next_positions(self):
         """Calculate the next possible positions.
@@ -506,26 +717,13 @@ class PaperRacer:
         If there is no position on the grid reachable at current speed set
         PRRacer.crash_position
         """
-        # reset stuff
-        self.possible_next_positions.clear()
-        self.crash_position = None
-
-        next_positions = [self.position + self.speed] \
-            + self.grid.neighbours(self.position + self.speed)
-        self.possible_next_positions = [
-            p for p in next_positions
-            if self.grid.is_reachable(self.position, p)
-        ]
-
-        # if there is no position reachable with current speed
-        # set crash_position to the last possible position
-        if not self.possible_next_positions:
-            line = self.grid.line(self.position, self.position + self.speed)
-            for p in line:
-                if self.grid.is_accessable(p):
-                    self.crash_position = p
-                else:
-                    break
+        # the work lives on the grid now, memoized by (position, speed)
+        candidates, crash_position \
+            = self.grid.reachable_from(self.position, self.speed)
+        self.possible_next_positions = list(candidates)
+        # sibling set for the membership test in goto
+        self._possible_set = set(candidates)
+        self.crash_position = crash_position
 
     def _evaluate_position(self):
         """Add new effects associated with the current position
@@ -535,14 +733,10 @@ class PaperRacer:
 
         The method is called by PRacer.goto() after the new position is set
         """
-        if self.grid[self.position] == PaperRacePointType.EFFECT:
-            if self.position in self.grid.effects:
-                self.add_effect(
-                    self.grid.effects[self.position].createNewEffectObj(self)
-                )
-            else:
-                #print("No effect associated!")
-                pass
+        if self.grid[self.position] == _EFFECT_CODE:
+            config = self.grid.effects.get(self.position)
+            if config is not None:
+                self.add_effect(config.createNewEffectObj(self))
 
     def add_effect(self, effect):
         """Add an effect to the PRRacer.effects list.
@@ -553,8 +747,11 @@ class PaperRacer:
         for the objecct itself and the other PRRacer object this one crashed
         into
         """
-        self.effects.append(effect)
-        self.effects.sort(key=lambda e: e.priority)
+        # the bucket is already sorted, one insertion keeps it that way
+        # (insort places behind equal priorities, like the stable sort
+        # of the appended list did)
+        bisect.insort(self.effects[effect.type], effect,
+                      key=_EFFECT_PRIORITY)
 
     def _apply_effects(self, effect_type):
         """Apply all effects of given type to the racer.
@@ -571,15 +768,17 @@ class PaperRacer:
             effect_type (PREffectType): type of the effects that should be
                applied
         """
-        remove_list = list()
-        for effect in filter(lambda e: e.type == effect_type, self.effects):
+        bucket = self.effects[effect_type]
+        if not bucket:
+            return
+        # one pass: apply and keep everything that hasn't ended, which
+        # replaces the filter+lambda walk and the O(n) removes
+        kept = []
+        for effect in bucket:
             effect.apply()
-            # mark ended effects for deletion
-            if effect.duration == 0:
-                remove_list.append(effect)
-        # delete old effects
-        for e in remove_list:
-            self.effects.remove(e)
+            if effect.duration != 0:
+                kept.append(effect)
+        self.effects[effect_type] = kept
 
     def goto(self, position):
         """Move to position and do everything what is caused by the movement
@@ -613,9 +812,9 @@ class PaperRacer:
             self.crash_position = None
             self.add_effect(PRCrashEffect(self))
             self.speed = Coord((0, 0))
-        elif position in self.possible_next_positions:
+        elif position in self._possible_set:
             other_racer = self.gamestate.racer_on_position(position)
-            if other_racer is not None and other_racer != self:
+            if other_racer is not None and other_racer is not self:
                 # Collision between two racer:
                 # set new position to the last position before the position
                 # of the other racer
@@ -639,22 +838,40 @@ class PaperRacer:
             return False
 
         self.position = new_position
-        self.path.append(new_position)
+        self._push_path(new_position)
 
         # check position for effects caused by it
         self._evaluate_position()
 
-        # apply effects on the speed of the racer
+        # apply effects on the speed of the racer; they only mutate
+        # PRRacer.speed, so the candidates below are computed exactly
+        # once, against the final speed
         self._apply_effects(PREffectType.SpeedEffect)
 
-        # calc the possible next positions
-        self._calc_possible_next_positions()
-
-        # apply effects on the possible next positions
-        self._apply_effects(PREffectType.TargetAreaEffect)
+        # calc the possible next positions and widen them by any
+        # active target area effects
+        self._rebuild_candidates()
 
         return True
 
+    def _rebuild_candidates(self):
+        """Recompute the possible next positions for the current speed.
+
+        Calculates the base candidates and applies the active
+        PREffectType.TargetAreaEffect effects on them in one pass, so
+        the stacked widenings work on the same set instead of
+        round-tripping through a list per effect.
+        """
+        self._calc_possible_next_positions()
+        if not self.effects[PREffectType.TargetAreaEffect]:
+            return
+        # hand the effects a set and convert back once at the end,
+        # instead of once per stacked effect
+        self.possible_next_positions = set(self.possible_next_positions)
+        self._apply_effects(PREffectType.TargetAreaEffect)
+        self._possible_set = self.possible_next_positions
+        self.possible_next_positions = list(self._possible_set)
+
 
 class PREffectConfig:
     """This class is used to create new PREffect objects.
@@ -803,6 +1020,12 @@ class PRConfig:
                 color = self.str_to_color(cp[sec].get("mapcolor"))
                 self.effects[color] = PREffectConfig(name, cp[sec])
 
+        # mirror of effects keyed by the RGB value packed into one int;
+        # load_from_bitmap matches cell colors against this, and int
+        # keys hash/compare faster than tuples
+        self._effects_packed = {r << 16 | g << 8 | b: cfg
+                                for (r, g, b), cfg in self.effects.items()}
+
 
 class PaperRaceGameState:
     """Main class of the game.
@@ -851,6 +1074,13 @@ class PaperRaceGameState:
             self.racer[i] = PaperRacer(
                 i, self.grid, self, random.choice(list(self.grid.startarea)))
 
+        # position -> racer index for racer_on_position; racers can
+        # share a start cell, so it always records the lowest id on a
+        # position (like the linear scan it replaces returned)
+        self._racer_by_pos = {}
+        for racer in self.racer.values():
+            self._racer_by_pos.setdefault(racer.position, racer)
+
         self.current_racer_id = 0
 
     def current_racer(self):
@@ -876,9 +1106,12 @@ class PaperRaceGameState:
             this case it is very likely, that the specified position is not
             in the current_racer().possible_next_positions list)
         """
-        if not self.current_racer().goto(position):
+        racer = self.current_racer()
+        old_position = racer.position
+        if not racer.goto(position):
             print("Something went wrong" + f" (racer_id: {self.current_racer_id}, pos: {position})")
             return False
+        self._update_racer_index(racer, old_position)
         if self.current_racer().position in self.grid.destarea:
             self.scoreboard[self.current_racer_id] \
                 = len(self.current_racer().path)
@@ -891,13 +1124,18 @@ class PaperRaceGameState:
         If there are no active racers left (because all reached the destination
         area, mark the game as finished.
         """
-        if len(self.scoreboard) >= len(self.racer):
+        n = len(self.racer)
+        if len(self.scoreboard) >= n:
             self.finished = True
             return
-        self.current_racer_id += 1
-        self.current_racer_id %= len(self.racer)
-        if self.current_racer_id in self.scoreboard:
-            self.next_player()
+        current = self.current_racer_id
+        # walk the ids once instead of recursing over the finished ones
+        for _ in range(n):
+            current = (current + 1) % n
+            if current not in self.scoreboard:
+                self.current_racer_id = current
+                return
+        self.finished = True
 
     def racer_on_position(self, position):
         """Check if there is a racer at position.
@@ -912,7 +1150,24 @@ class PaperRaceGameState:
             The PRRacer object if there is a racer at the position, None
             otherwise
         """
-        for racer in self.racer.values():
-            if racer.position == position:
-                return racer
-        return None
+        return self._racer_by_pos.get(position)
+
+    def _update_racer_index(self, racer, old_position):
+        """Keep the position index in sync after racer moved away from
+        old_position.
+
+        The index maps every occupied position to the racer with the
+        lowest id on it, so racer_on_position keeps answering like the
+        linear scan did even while racers share a cell.
+        """
+        index = self._racer_by_pos
+        if index.get(old_position) is racer:
+            del index[old_position]
+            # another racer may still sit on the freed cell
+            for other in self.racer.values():
+                if other is not racer and other.position == old_position:
+                    index[old_position] = other
+                    break
+        occupant = index.get(racer.position)
+        if occupant is None or racer.id < occupant.id:
+            index[racer.position] = racer
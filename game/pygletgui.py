@@ -8,25 +8,34 @@ import math
 import time
 import random
 
+import numpy as np
+
 key = pyglet.window.key
 
+# decoded images by path; the racers share their PNGs and layers get
+# rebuilt on map reloads, so decode every file only once
+_IMAGE_CACHE = {}
+
 
-class GridPoint:
-    def __init__(self, pos: pyglet.math.Vec2, grid_width, grid_height, size=15, width=2,
-                 color=(255, 255, 255),
-                 batch=None, group=None):
-        offset_x = (grid_width-size) // 2
-        offset_y = (grid_height-size) // 2
-        self.line1 = pyglet.shapes.Line(offset_x+pos.x+size//2, offset_y+pos.y,
-                                        offset_x+pos.x+size//2, offset_y+pos.y+size,
-                                        width, color, batch, group)
-        self.line2 = pyglet.shapes.Line(offset_x+pos.x, offset_y+pos.y+size//2,
-                                        offset_x+pos.x+size, offset_y+pos.y+size//2,
-                                        width, color, batch, group)
+def _load_image(path):
+    """pyglet.image.load with a decode-once cache.
+
+    Anchors are left untouched, the callers position their sprites
+    with their own offsets.
+    """
+    img = _IMAGE_CACHE.get(path)
+    if img is None:
+        img = pyglet.image.load(path)
+        _IMAGE_CACHE[path] = img
+    return img
 
 
 class Layer:
-    def __init__(self, gamestate: PaperRaceGameState, width, height):
+    __slots__ = ("gamestate", "grid", "width", "height",
+                 "grid_width", "grid_height", "batch", "group")
+
+    def __init__(self, gamestate: PaperRaceGameState, width, height,
+                 batch, group=None):
         self.gamestate = gamestate
         self.grid = self.gamestate.grid
         self.width = width
@@ -35,7 +44,10 @@ class Layer:
         self.grid_width = self.width//self.grid.width
         self.grid_height = self.height//self.grid.height
 
-        self.batch = pyglet.graphics.Batch()
+        # all layers share the window's batch; the group fixes the
+        # draw order of this layer within it
+        self.batch = batch
+        self.group = group
 
     def pos_game2ui(self, p: Coord):
         return pyglet.math.Vec2(
@@ -43,16 +55,32 @@ class Layer:
             (self.gamestate.grid.height - p[1] - 0.5)*self.grid_height
         )
 
+    def pos_game2ui_array(self, coords):
+        """Vectorized pos_game2ui for an (n, 2) array of game coords.
+
+        Returns an (n, 2) float32 array of UI positions.
+        """
+        coords = np.asarray(coords)
+        return np.column_stack((
+            (coords[:, 0] + 0.5) * self.grid_width,
+            (self.gamestate.grid.height - coords[:, 1] - 0.5)
+            * self.grid_height
+        )).astype(np.float32)
+
 
 class GridLayer(Layer):
-    def __init__(self, gamestate: PaperRaceGameState, width, height):
-        super().__init__(gamestate, width, height)
+    __slots__ = ("background_group", "points_group", "background_img",
+                 "background_sprite", "points_vlist")
 
-        self.background_group = pyglet.graphics.Group(order=0)
-        self.points_group = pyglet.graphics.Group(order=1)
+    def __init__(self, gamestate: PaperRaceGameState, width, height,
+                 batch, group=None):
+        super().__init__(gamestate, width, height, batch, group)
+
+        self.background_group = pyglet.graphics.Group(order=0, parent=group)
+        self.points_group = pyglet.graphics.Group(order=1, parent=group)
 
         if self.gamestate.config.ui_background_image != "None":
-            self.background_img = pyglet.image.load(
+            self.background_img = _load_image(
                 # self.gamestate.config.map_filename)
                 self.gamestate.config.ui_background_image)
             self.background_sprite = pyglet.sprite.Sprite(
@@ -64,41 +92,54 @@ class GridLayer(Layer):
                 scale_y=self.height/self.background_img.height
             )
 
-        self.points = {}
-
-        for coord, t in self.grid.items():
-            p = Coord(self.pos_game2ui(coord))
-            if t == PaperRacePointType.STREET:
-                self.points[p] = GridPoint(
-                    p,
-                    self.grid_width,
-                    self.grid_height,
-                    color=(0, 255, 0),
-                    batch=self.batch,
-                    group=self.points_group
-                )
-            elif t == PaperRacePointType.EFFECT:
-                self.points[Coord(p)] = GridPoint(
-                    p,
-                    self.grid_width,
-                    self.grid_height,
-                    color=(255, 255, 0),
-                    batch=self.batch,
-                    group=self.points_group
-                )
-            else:
-                continue
-                self.points[p] = GridPoint(
-                    p,
-                    self.grid_width,
-                    self.grid_height,
-                    color=(0, 0, 0),
-                    batch=self.batch,
-                    group=self.points_group
-                )
+        # all cross markers go into one GL_LINES vertex list instead of
+        # two Line shapes (and their vertex lists) per grid cell
+        size = 15
+        offset_x = (self.grid_width - size) // 2
+        offset_y = (self.grid_height - size) // 2
+
+        # the grid gathered the marker cells at load time, so there is
+        # no Python loop left here: one transform, then array fills
+        street = self.grid.street_coords
+        effect = self.grid.effect_coords
+
+        coords = np.concatenate((street, effect))
+        centers = self.pos_game2ui_array(coords)
+
+        n = len(coords)
+        x = centers[:, 0] + offset_x
+        y = centers[:, 1] + offset_y
+        verts = np.zeros((n, 4, 3), dtype=np.float32)
+        verts[:, 0, 0] = x + size//2
+        verts[:, 0, 1] = y
+        verts[:, 1, 0] = x + size//2
+        verts[:, 1, 1] = y + size
+        verts[:, 2, 0] = x
+        verts[:, 2, 1] = y + size//2
+        verts[:, 3, 0] = x + size
+        verts[:, 3, 1] = y + size//2
+
+        colors = np.empty((n, 4, 4), dtype=np.uint8)
+        colors[:len(street)] = (0, 255, 0, 255)
+        colors[len(street):] = (255, 255, 0, 255)
+
+        program = pyglet.graphics.get_default_shader()
+        self.points_vlist = program.vertex_list(
+            4 * n, pyglet.gl.GL_LINES,
+            batch=self.batch,
+            group=self.points_group,
+            position=('f', verts.ravel()),
+            colors=('Bn', colors.ravel())
+        )
 
 
 class Racer:
+    __slots__ = ("grid_width", "grid_height", "racer_id", "batch", "group",
+                 "pos", "offset_x", "offset_y", "path", "show_path",
+                 "path_group", "path_color", "label", "img", "sprite",
+                 "new_pos", "start_x", "start_y", "dx", "dy",
+                 "motion_start_time", "rotation", "moving")
+
     def __init__(self, pos: pyglet.math.Vec2, grid_width, grid_height, racer_id,
                  image="res/car.png", show_path=True,
                  batch=None, group=None, path_group=None):
@@ -137,17 +178,17 @@ class Racer:
         return (r, g, b)
         
     def set_image(self, image):
-        self.img = pyglet.image.load(image)
+        self.img = _load_image(image)
         self.img.anchor_x = self.img.width // 2
         self.img.anchor_y = self.img.height // 2
         self.sprite = pyglet.sprite.Sprite(self.img, self.pos.x+self.offset_x, self.pos.y+self.offset_y, batch=self.batch, group=self.group)
         self.sprite.scale = self.grid_width/self.img.width * 2.5
         
-    def _set_pos(self, pos):
-        self.sprite.x = pos.x + self.offset_x
-        self.sprite.y = pos.y + self.offset_y
-        self.label.x = pos.x - self.offset_x
-        self.label.y = pos.y - self.offset_y
+    def _set_pos(self, x, y):
+        self.sprite.x = x + self.offset_x
+        self.sprite.y = y + self.offset_y
+        self.label.x = x - self.offset_x
+        self.label.y = y - self.offset_y
 
     def _update_path(self, pos):
         if len(self.path) == 0:
@@ -170,44 +211,50 @@ class Racer:
     def update_pos(self, pos):
         self._update_path(pos)
         if self.pos is None or self.pos == pos:
-            self.sprite.x = pos.x + self.offset_x
-            self.sprite.y = pos.y + self.offset_y
             self.pos = pos
-            self._set_pos(pos)
+            self._set_pos(pos.x, pos.y)
             self.moving = False
             self.rotation = 0
         else:
+            # plain float state for the animation; no Vec2 allocation
+            # or normalize() per animated frame
             self.new_pos = pos
-            self.pos = pyglet.math.Vec2(self.sprite.x - self.offset_x, self.sprite.y - self.offset_y)
-            self.direction = self.new_pos - self.pos
-            self.unit_speed = self.direction.normalize()
+            self.start_x = self.sprite.x - self.offset_x
+            self.start_y = self.sprite.y - self.offset_y
+            self.pos = pyglet.math.Vec2(self.start_x, self.start_y)
+            self.dx = pos.x - self.start_x
+            self.dy = pos.y - self.start_y
             self.motion_start_time = time.time()
-            self.rotation = 90 - math.atan2(self.unit_speed.y, self.unit_speed.x) * 180/math.pi
+            self.rotation = 90 - math.degrees(math.atan2(self.dy, self.dx))
             self.sprite.rotation = self.rotation
+            # the render loop advances the animation via animate(), no
+            # extra clock callback per racer
+            self.moving = True
 
-            pyglet.clock.schedule_interval(self._move, 1/60.0)
-
-    def _move(self, dt):
-        self.moving = True
-        _dt = time.time() - self.motion_start_time
+    def animate(self, now):
+        """Advance the move animation, called once per drawn frame."""
+        if not self.moving:
+            return
+        _dt = now - self.motion_start_time
         if _dt < 1:
-            pos = self.pos + pyglet.math.Vec2(_dt*self.direction[0], _dt*self.direction[1])
-            self._set_pos(round(pos))
+            self._set_pos(round(self.start_x + self.dx*_dt),
+                          round(self.start_y + self.dy*_dt))
         else:
             self.pos = self.new_pos
-            self._set_pos(self.pos)
-            pyglet.clock.unschedule(self._move)
+            self._set_pos(self.pos.x, self.pos.y)
             self.moving = False
 
 
 class RacerLayer(Layer):
+    __slots__ = ("path_group", "racer_group", "racer")
+
     images = ["res/viper.png", "res/taxi.png", "res/car.png", "res/audi.png"]
 
-    def __init__(self, gamestate, width, height):
-        super().__init__(gamestate, width, height)
+    def __init__(self, gamestate, width, height, batch, group=None):
+        super().__init__(gamestate, width, height, batch, group)
 
-        self.path_group = pyglet.graphics.Group(order=0)
-        self.racer_group = pyglet.graphics.Group(order=1)
+        self.path_group = pyglet.graphics.Group(order=0, parent=group)
+        self.racer_group = pyglet.graphics.Group(order=1, parent=group)
 
         self.racer = {}
         for racer_id in self.gamestate.racer:
@@ -231,68 +278,137 @@ class RacerLayer(Layer):
 
 
 class CurrentRacerLayer(Layer):
-    def __init__(self, gamestate, width, height):
-        super().__init__(gamestate, width, height)
+    __slots__ = ("_target_pool", "line", "valid_targets",
+                 "_half_gw", "_half_gh", "_racer_ui_center",
+                 "_coord_buf", "_ui_buf")
+
+    def __init__(self, gamestate, width, height, batch, group=None):
+        super().__init__(gamestate, width, height, batch, group)
+
+        # pool of marker ellipses, repositioned every turn instead of
+        # being torn down and rebuilt; grows with the biggest fan-out
+        # seen (target area effects can widen it beyond the usual 9)
+        self._target_pool = []
 
-        self.target_area = {}
+        # half cell offsets used on every hover and update
+        self._half_gw = self.grid_width//2
+        self._half_gh = self.grid_height//2
+
+        # scratch buffers for the per-turn coordinate transform, grown
+        # on demand and reused so update() allocates nothing
+        self._coord_buf = np.empty((16, 2), np.float32)
+        self._ui_buf = np.empty((16, 2), np.float32)
+
+        # one persistent highlight line, toggled via visible instead of
+        # being reallocated on every mouse motion event
+        self.line = pyglet.shapes.Line(
+            0, 0, 0, 0,
+            width=2,
+            color=(255, 0, 0),
+            batch=self.batch,
+            group=self.group)
+        self.line.visible = False
 
         self.update()
 
     def update(self):
-        self.target_area.clear()
         possible_next_positions = self.gamestate.current_racer().possible_next_positions
         if not possible_next_positions:
             possible_next_positions = [self.gamestate.current_racer().crash_position]
-        for game_pos in possible_next_positions:
-            pos = self.pos_game2ui(game_pos)
-            self.target_area[game_pos] = pyglet.shapes.Ellipse(
-                pos.x+self.grid_width//2,
-                pos.y+self.grid_height//2,
+
+        # positions the mouse handlers accept this turn, as a set for
+        # the O(1) membership test per motion event
+        self.valid_targets = set(possible_next_positions)
+
+        # the racer only moves on goto, so its UI anchor for the
+        # highlight line is fixed for the whole turn
+        r_pos = self.pos_game2ui(self.gamestate.current_racer().position)
+        self._racer_ui_center = (r_pos.x+self._half_gw,
+                                 r_pos.y+self._half_gh)
+
+        k = len(possible_next_positions)
+        if k > len(self._coord_buf):
+            self._coord_buf = np.empty((k, 2), np.float32)
+            self._ui_buf = np.empty((k, 2), np.float32)
+        buf = self._coord_buf[:k]
+        buf[:] = possible_next_positions
+        ui = self._ui_buf[:k]
+        # the pos_game2ui math plus the half cell marker offset,
+        # written in place into the scratch buffer
+        np.add(buf[:, 0], 0.5, out=ui[:, 0])
+        ui[:, 0] *= self.grid_width
+        ui[:, 0] += self._half_gw
+        np.subtract(self.gamestate.grid.height - 0.5, buf[:, 1],
+                    out=ui[:, 1])
+        ui[:, 1] *= self.grid_height
+        ui[:, 1] += self._half_gh
+
+        pool = self._target_pool
+        while len(pool) < k:
+            pool.append(pyglet.shapes.Ellipse(
+                0,
+                0,
                 self.grid_width//2,
                 self.grid_height//2,
                 color=(255, 0, 0),
-                batch=self.batch)
+                batch=self.batch,
+                group=self.group))
+
+        for i in range(k):
+            ellipse = pool[i]
+            ellipse.x = ui[i, 0]
+            ellipse.y = ui[i, 1]
+            ellipse.visible = True
+        for ellipse in pool[k:]:
+            ellipse.visible = False
         self.remove_highlight()
 
     def highlight_pos(self, game_pos):
         pos = self.pos_game2ui(game_pos)
-        r_pos = self.pos_game2ui(self.gamestate.current_racer().position)
-        self.line = pyglet.shapes.Line(
-            r_pos.x+self.grid_width//2,
-            r_pos.y+self.grid_height//2,
-            pos.x+self.grid_width//2,
-            pos.y+self.grid_height//2,
-            width=2,
-            color=(255, 0, 0),
-            batch=self.batch)
+        self.line.x, self.line.y = self._racer_ui_center
+        self.line.x2 = pos.x+self._half_gw
+        self.line.y2 = pos.y+self._half_gh
+        self.line.visible = True
 
     def remove_highlight(self):
-        self.line = None
+        self.line.visible = False
 
 
 class AgentLayer(Layer):
-    def __init__(self, gamestate, width, height, agent):
-        super().__init__(gamestate, width, height)
+    __slots__ = ("agent", "img", "sprite")
+
+    def __init__(self, gamestate, width, height, agent, batch, group=None):
+        super().__init__(gamestate, width, height, batch, group)
         self.agent = agent
 
-        self.points = {}
-
-        max_val = self.agent.max_h
-
-        for pos in self.agent.h:
-            p = self.pos_game2ui(pos)
-            h = self.agent.h[pos]
-            c = round(h/max_val * 255)
-            color = (c, c, c)
-            self.points[pos] = pyglet.shapes.Rectangle(
-                p.x,
-                p.y,
-                self.grid_width,
-                self.grid_height,
-                color=color,
-                batch=self.batch
-            )
-            self.points[pos].opacity = 170
+        # the whole heatmap becomes one RGBA texture (one texel per
+        # cell, scaled up to cell size) instead of a Rectangle shape
+        # per reached cell
+        h_arr = self.agent.h
+        w, h = h_arr.shape
+        reached = np.isfinite(h_arr)
+
+        c = np.zeros((w, h), dtype=np.uint8)
+        c[reached] = np.rint(h_arr[reached] / self.agent.max_h
+                             * 255).astype(np.uint8)
+
+        # image rows run bottom to top while game y runs top to bottom,
+        # so transpose to (row, column) and flip
+        arr = np.zeros((h, w, 4), dtype=np.uint8)
+        arr[..., 0] = arr[..., 1] = arr[..., 2] = c.T[::-1]
+        arr[..., 3] = np.where(reached.T[::-1], 170, 0)
+
+        self.img = pyglet.image.ImageData(w, h, 'RGBA', arr.tobytes())
+        # the rectangles sat half a cell up and right of the cell
+        # center, keep the texture there
+        self.sprite = pyglet.sprite.Sprite(
+            self.img,
+            self.grid_width//2,
+            self.grid_height//2,
+            batch=self.batch,
+            group=self.group)
+        self.sprite.update(scale_x=self.grid_width,
+                           scale_y=self.grid_height)
 
 
 class Main(pyglet.window.Window):
@@ -315,16 +431,35 @@ class Main(pyglet.window.Window):
 
         self.sprites = OrderedDict()
 
+        # one batch for everything; the groups fix the layer order so a
+        # frame is a single batch.draw() instead of one draw per layer
         self.batch = pyglet.graphics.Batch()
+        self._agent_group = pyglet.graphics.Group(order=1)
 
         if fps:
-            self.sprites['fps_label'] = pyglet.text.Label('0 fps', x=10, y=10, batch=self.batch)
+            self.sprites['fps_label'] = pyglet.text.Label(
+                '0 fps', x=10, y=10, batch=self.batch,
+                group=pyglet.graphics.Group(order=4))
             self.last_update = time.time()
             self.fps_count = 0
 
-        self.grid_layer = GridLayer(self.gamestate, self.width, self.height)
-        self.racer_layer = RacerLayer(self.gamestate, self.width, self.height)
-        self.current_racer_layer = CurrentRacerLayer(self.gamestate, self.width, self.height)
+        self.grid_layer = GridLayer(
+            self.gamestate, self.width, self.height,
+            self.batch, pyglet.graphics.Group(order=0))
+        self.racer_layer = RacerLayer(
+            self.gamestate, self.width, self.height,
+            self.batch, pyglet.graphics.Group(order=3))
+        self.current_racer_layer = CurrentRacerLayer(
+            self.gamestate, self.width, self.height,
+            self.batch, pyglet.graphics.Group(order=2))
+
+        # constants of pos_ui2game, hoisted off the per-motion-event
+        # attribute chains
+        self._gw = self.grid_layer.grid_width
+        self._gh = self.grid_layer.grid_height
+        self._half_gw = 0.5*self._gw
+        self._half_gh = 0.5*self._gh
+        self._gh_minus1 = self.gamestate.grid.height - 1
 
         self.keys = OrderedDict()
 
@@ -334,16 +469,25 @@ class Main(pyglet.window.Window):
         self.alive = 1
 
         self.agents = {}
+        # only set up by add_agent; nothing is drawn for it in
+        # human-only games
+        self.agent_layer = None
+
+        # the scene only changes on moves, running animations and
+        # hover changes; everything else skips the redraw
+        self._dirty = True
 
     def add_agent(self, agent, racer_id):
         self.agents[racer_id] = agent
         # DEBUG LAYER
-        self.agent_layer = AgentLayer(self.gamestate, self.width, self.height, agent)
+        self.agent_layer = AgentLayer(self.gamestate, self.width,
+                                      self.height, agent,
+                                      self.batch, self._agent_group)
         self.racer_layer.racer_is_agent(racer_id)
 
     def pos_ui2game(self, x, y):
-        gx = (x-0.5*self.grid_layer.grid_width) // self.grid_layer.grid_width
-        gy = self.gamestate.grid.height - (y-0.5*self.grid_layer.grid_height) // self.grid_layer.grid_height - 1
+        gx = (x-self._half_gw) // self._gw
+        gy = self._gh_minus1 - (y-self._half_gh) // self._gh
         return Coord((int(gx), int(gy)))
 
     def on_draw(self):
@@ -351,6 +495,7 @@ class Main(pyglet.window.Window):
 
     def on_close(self):
         self.alive = 0
+        pyglet.app.exit()
 
     def on_mouse_motion(self, x, y, dx, dy):
         self.mouse_x = x
@@ -358,29 +503,30 @@ class Main(pyglet.window.Window):
 
         self.mouse_game_pos = self.pos_ui2game(x, y)
 
-        # print(self.mouse_game_pos, self.current_racer_layer.target_area)
         if self.gamestate.current_racer_id in self.agents:
             return
-        
-        if self.mouse_game_pos in self.gamestate.current_racer().possible_next_positions \
-                or self.mouse_game_pos == self.gamestate.current_racer().crash_position:
+
+        if self.mouse_game_pos in self.current_racer_layer.valid_targets:
             self.current_racer_layer.highlight_pos(self.mouse_game_pos)
-        elif self.current_racer_layer.line != None:
+            self._dirty = True
+        elif self.current_racer_layer.line.visible:
             self.current_racer_layer.remove_highlight()
+            self._dirty = True
 
     def on_mouse_release(self, x, y, button, modifiers):
         print('Released mouse at {}x{}'.format(x, y))
         if self.gamestate.current_racer_id in self.agents:
             return
-        if self.mouse_game_pos in self.gamestate.current_racer().possible_next_positions \
-                or self.mouse_game_pos == self.gamestate.current_racer().crash_position:
+        if self.mouse_game_pos in self.current_racer_layer.valid_targets:
             racer_id = self.gamestate.current_racer_id
             self.gamestate.goto(self.mouse_game_pos)
             self.racer_layer.update_racer(racer_id)
             self.current_racer_layer.update()
+            self._dirty = True
 
             if self.gamestate.finished:
                 self.alive = False
+                pyglet.app.exit()
 
     def on_mouse_press(self, x, y, button, modifiers):
         if button == 1:
@@ -401,6 +547,7 @@ class Main(pyglet.window.Window):
     def on_key_press(self, symbol, modifiers):
         if symbol == key.ESCAPE:  # [ESC]
             self.alive = 0
+            pyglet.app.exit()
 
         self.keys[symbol] = True
 
@@ -408,48 +555,55 @@ class Main(pyglet.window.Window):
         pass
 
     def render(self):
-        self.clear()
+        # the event loop flips after every on_draw regardless, so even
+        # a clean frame must be drawn - the dirty flag only skips the
+        # animation stepping and the FPS bookkeeping
+        moving = any(racer.moving
+                     for racer in self.racer_layer.racer.values())
+        if self._dirty or moving:
+            self._dirty = False
+
+            # step the running move animations with the frame we are
+            # about to draw
+            now = time.time()
+            for racer in self.racer_layer.racer.values():
+                if racer.moving:
+                    racer.animate(now)
+
+            # FPS stuff (if you want to)
+            self.fps_count += 1
+            if now - self.last_update > 1: # 1 sec passed
+                self.sprites['fps_label'].text = str(self.fps_count)
+                self.fps_count = 0
+                self.last_update = now
+
+            # self.bg.draw()
+            self.pre_render()
 
-        # FPS stuff (if you want to)
-        self.fps_count += 1
-        if time.time() - self.last_update > 1: # 1 sec passed
-            self.sprites['fps_label'].text = str(self.fps_count)
-            self.fps_count = 0
-            self.last_update = time.time()
-
-        # self.bg.draw()
-        self.pre_render()
-
-        #for sprite in self.sprites:
-        #    self.sprites[sprite].draw()
+        self.clear()
 
-        
-        self.grid_layer.batch.draw()
-        self.agent_layer.batch.draw()
-        self.current_racer_layer.batch.draw()
-        self.racer_layer.batch.draw()
+        # no flip() here: the event loop presents the frame after
+        # on_draw returns
         self.batch.draw()
 
-        self.flip()
-
-    def run(self):
-        while self.alive == 1:
-            racer_id = self.gamestate.current_racer_id
-            if racer_id in self.agents and not self.racer_layer.racer[racer_id].moving:
-                pos = self.agents[self.gamestate.current_racer_id].next_position()
+    def _agent_step(self, dt):
+        racer_id = self.gamestate.current_racer_id
+        if racer_id in self.agents and not self.racer_layer.racer[racer_id].moving:
+            pos = self.agents[self.gamestate.current_racer_id].next_position()
 
-                if not self.gamestate.goto(pos):
-                    raise NameError("Invalid move by agent")
-                self.racer_layer.update_racer(racer_id)
-                self.current_racer_layer.update()
-
-                if self.gamestate.finished:
-                    self.alive = False
+            if not self.gamestate.goto(pos):
+                raise NameError("Invalid move by agent")
+            self.racer_layer.update_racer(racer_id)
+            self.current_racer_layer.update()
+            self._dirty = True
 
-            self.render()
+            if self.gamestate.finished:
+                self.alive = False
+                pyglet.app.exit()
 
-            # -----------> This is key <----------
-            # This is what replaces pyglet.app.run()
-            # but is required for the GUI to not freeze
-            pyglet.clock.tick()
-            event = self.dispatch_events()
+    def run(self):
+        # the standard pyglet event loop sleeps between frames instead
+        # of the old hand-written poll-as-fast-as-possible loop; the
+        # agents move from a scheduled callback
+        pyglet.clock.schedule_interval(self._agent_step, 1/60.0)
+        pyglet.app.run()